@@ -0,0 +1,12 @@
+# gunicorn.conf.py — picked up automatically by `gunicorn server:app`
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2))
+# Threaded workers: the CPU-heavy upload path (ICS parsing, jcal build, compression) and the daily
+# jcal rebuild only hold up their own thread, while other threads keep serving /i/, /j/ and /meta/.
+# A gevent loop would stall every connection on the worker during that work.
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+preload_app = True        # import server.py once so workers share its read-only state copy-on-write
@@ -1,24 +1,300 @@
 # server.py
 import os
-import uuid
-import json
-from flask import Flask, request, jsonify, abort, send_file, render_template_string
-from werkzeug.utils import secure_filename
+import secrets
+import shutil
+import base64
+import gzip
+import brotli
+import orjson
+import icalendar
+from datetime import datetime, time, timedelta
+from dateutil.rrule import rrulestr
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from flask import Flask, request, jsonify, abort, send_file
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from werkzeug.routing import BaseConverter
 
 # Config
 UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "/tmp/uploads")   # set to /uploads if Render persistent disk mounted, otherwise /tmp/uploads
 MAX_BYTES = 2 * 1024 * 1024  # 2 MB max file size
-ALLOWED_EXT = {".ics"}
+CACHE_MAX_AGE = 300  # seconds; file ids are random so uploads are effectively immutable
+ALLOWED_EXT = (".ics",)  # tuple so str.endswith can test it directly
+EVENT_WINDOW_DAYS = 7  # pre-parsed schedules keep only events from today through the next week
+# Limits on recurrence expansion, so a tiny ICS can't pin a worker (uploads over them get a 400)
+UNSUPPORTED_FREQS = {"SECONDLY", "MINUTELY", "HOURLY"}
+MAX_RRULE_STEPS = 20000           # occurrences walked from DTSTART to the end of the window, per event
+MAX_WINDOW_OCCURRENCES = 500      # occurrences kept inside the window, per calendar
+SUMMARY_MAX_COUNT = 1000          # RRULE COUNTs above this are reported as open-ended in the metadata
+LEGACY_ID_LEN = 32  # uuid4().hex ids from before sharding
+X_ACCEL_PREFIX = os.environ.get("X_ACCEL_PREFIX")   # e.g. /_protected/ when nginx serves UPLOAD_DIR as an internal location
+
+SCHEDULE_PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "schedule.html")
+SCHEDULE_PAGE_MAX_AGE = 86400  # the page is the same for every schedule; it reads file_id from the URL
 
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+class OrjsonProvider(JSONProvider):
+    # jsonify() through orjson: no key sorting, no pretty-printing, bytes straight into the response
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
+class FileIdConverter(BaseConverter):
+    # Only ids this server hands out (16 hex chars, or 32 for uploads from before sharding) ever reach
+    # path_for; anything else, such as "..x", is a 404 before a path is built
+    regex = r"[0-9a-f]{16}|[0-9a-f]{32}"
+
 app = Flask(__name__, static_folder=None)
+app.url_map.converters["file_id"] = FileIdConverter
+app.json = OrjsonProvider(app)
 app.config["MAX_CONTENT_LENGTH"] = MAX_BYTES
 CORS(app, resources={r"/*": {"origins": "*"}})  # allow cross-origin requests (Firebase frontend will call /upload)
 
+def path_for(file_id, ext):
+    # Uploads are sharded into UPLOAD_DIR/<first two hex chars>/ so no single directory grows unbounded.
+    # Uploads from before sharding (32-char uuid ids) may still sit flat in UPLOAD_DIR; their .json decides.
+    if len(file_id) == LEGACY_ID_LEN and os.path.exists(os.path.join(UPLOAD_DIR, f"{file_id}.json")):
+        return os.path.join(UPLOAD_DIR, f"{file_id}{ext}")
+    return os.path.join(UPLOAD_DIR, file_id[:2], f"{file_id}{ext}")
+
+@lru_cache(maxsize=4096)
+def _load_meta_cached(file_id, mtime_ns):
+    # mtime_ns is only part of the cache key, so a rewritten file gets re-read.
+    # Returns (meta dict, serialized JSON bytes) so /meta/ never re-encodes.
+    with open(path_for(file_id, ".json"), "rb") as f:
+        raw = f.read()
+    return orjson.loads(raw), raw
+
+def load_meta(file_id):
+    # Returns the parsed metadata dict (shared, do not mutate); raises FileNotFoundError if missing
+    st = os.stat(path_for(file_id, ".json"))
+    return _load_meta_cached(file_id, st.st_mtime_ns)[0]
+
+def file_etag(st):
+    # Strong validator from mtime + size, cheap to compute from a single stat
+    return f"{st.st_mtime_ns}-{st.st_size}"
+
+def set_cache_headers(rv, immutable=True):
+    # immutable only for upload content (/i/, /meta/); /j/ is rebuilt daily and must revalidate
+    rv.cache_control.public = True
+    rv.cache_control.max_age = CACHE_MAX_AGE
+    rv.cache_control.immutable = immutable
+    return rv
+
+def extract_tz(cal):
+    # Same lookup the page used to do with ical.js: first VTIMEZONE, else first DTSTART's TZID
+    for comp in cal.walk("vtimezone"):
+        return str(comp["TZID"])
+    for ev in cal.walk("vevent"):
+        tzid = ev["DTSTART"].params.get("TZID") if "DTSTART" in ev else None
+        if tzid:
+            return str(tzid)
+        break
+    return "UTC"
+
+def wall_clock(value, tz):
+    # The page compares against "now" as wall-clock time in the schedule tz, so emit naive local times
+    if not isinstance(value, datetime):
+        return datetime.combine(value, time())
+    if value.tzinfo is not None:
+        if tz is not None:
+            value = value.astimezone(tz)
+        value = value.replace(tzinfo=None)
+    return value
+
+def resolve_tz(tz_name):
+    try:
+        return ZoneInfo(tz_name)
+    except (ValueError, KeyError):  # non-IANA TZID (e.g. Outlook names): keep the event's own wall time
+        return None
+
+def event_bounds(ev, tz):
+    # Wall-clock (start, end) of the first occurrence of ev
+    start = ev["DTSTART"].dt
+    if "DTEND" in ev:
+        end = ev["DTEND"].dt
+    elif "DURATION" in ev:
+        end = start + ev["DURATION"].dt
+    else:
+        end = start + timedelta(days=1) if not isinstance(start, datetime) else start
+    return wall_clock(start, tz), wall_clock(end, tz)
+
+def event_rule(ev, tz, start):
+    # rruleset for ev's RRULE(s) minus its EXDATEs, expanded in naive wall-clock time so classes stay
+    # at 9:00 across DST and UNTIL matches DTSTART. A VEVENT may carry several RRULE properties.
+    rrules = ev["RRULE"] if isinstance(ev["RRULE"], list) else [ev["RRULE"]]
+    for r in rrules:
+        freq = str(r.get("FREQ", [""])[0]).upper()
+        if freq in UNSUPPORTED_FREQS:
+            raise ValueError(f"FREQ={freq} recurrences are not supported")
+    lines = "\n".join("RRULE:" + r.to_ical().decode() for r in rrules)
+    rule = rrulestr(lines, dtstart=start, ignoretz=True, forceset=True)
+    exdate = ev.get("EXDATE", [])
+    for ex in (exdate if isinstance(exdate, list) else [exdate]):
+        for d in ex.dts:
+            rule.exdate(wall_clock(d.dt, tz))
+    return rule
+
+def expand_event(ev, tz, window_start, window_end, overridden=frozenset()):
+    # Yield (start, end) wall-clock pairs of ev that overlap the window, expanding RRULEs lazily.
+    # overridden holds the RECURRENCE-IDs of this UID that separate override VEVENTs replace.
+    start, end = event_bounds(ev, tz)
+    duration = end - start
+
+    if "RRULE" not in ev:
+        if end >= window_start and start < window_end:
+            yield start, end
+        return
+
+    # Walk the rule lazily from DTSTART; the step cap bounds the work for dense or long-running rules
+    for steps, occ in enumerate(event_rule(ev, tz, start), 1):
+        if steps > MAX_RRULE_STEPS:
+            raise ValueError(f"recurrence has more than {MAX_RRULE_STEPS} occurrences before the current week")
+        if occ >= window_end:
+            break
+        if occ + duration >= window_start and occ not in overridden:
+            yield occ, occ + duration
+
+def rule_last_start(rrule, start, tz):
+    # Latest possible start for one RRULE without walking it: UNTIL is used directly, a small COUNT is
+    # expanded (at most SUMMARY_MAX_COUNT steps). None when the rule is open-ended or COUNT is larger.
+    if "UNTIL" in rrule:
+        until = rrule["UNTIL"][0]
+        if not isinstance(until, datetime):
+            return datetime.combine(until, start.time())
+        return wall_clock(until, tz)
+    if "COUNT" in rrule and int(rrule["COUNT"][0]) <= SUMMARY_MAX_COUNT:
+        return list(rrulestr("RRULE:" + rrule.to_ical().decode(), dtstart=start, ignoretz=True))[-1]
+    return None
+
+def summarize_calendar(cal):
+    # Calendar-wide facts stored in the metadata at upload, so viewers never need the ICS for them.
+    # first_start / last_end span every occurrence; for recurring events last_end is the UNTIL bound
+    # (or the last of a small COUNT), and None when some event repeats forever or too many times.
+    tz_name = extract_tz(cal)
+    tz = resolve_tz(tz_name)
+    vevents = cal.walk("vevent")
+    first_start = last_end = None
+    open_ended = False
+    for ev in vevents:
+        if "DTSTART" not in ev:
+            continue
+        start, end = event_bounds(ev, tz)
+        if "RRULE" in ev:
+            rrules = ev["RRULE"] if isinstance(ev["RRULE"], list) else [ev["RRULE"]]
+            last_starts = [rule_last_start(r, start, tz) for r in rrules]
+            if None in last_starts:
+                open_ended = True
+            else:
+                end = max(last_starts) + (end - start)
+        first_start = start if first_start is None else min(first_start, start)
+        last_end = end if last_end is None else max(last_end, end)
+    return {
+        "tz": tz_name,
+        "event_count": len(vevents),
+        "first_start": first_start.isoformat() if first_start else None,
+        "last_end": last_end.isoformat() if last_end and not open_ended else None,
+    }
+
+def build_jcal(cal, now=None):
+    # The page reads this instead of running ICAL.parse on every view.
+    # Only occurrences in [today, today + EVENT_WINDOW_DAYS] are kept so the page's per-second loop stays small.
+    tz_name = extract_tz(cal)
+    tz = resolve_tz(tz_name)
+    now = now or datetime.now(tz).replace(tzinfo=None)
+    window_start = datetime.combine(now.date(), time())
+    window_end = window_start + timedelta(days=EVENT_WINDOW_DAYS + 1)
+
+    vevents = [ev for ev in cal.walk("vevent") if "DTSTART" in ev]
+    overrides = {}
+    for ev in vevents:
+        if "RECURRENCE-ID" in ev:
+            overrides.setdefault(str(ev.get("UID", "")), set()).add(wall_clock(ev["RECURRENCE-ID"].dt, tz))
+
+    events = []
+    for ev in vevents:
+        overridden = overrides.get(str(ev.get("UID", "")), frozenset()) if "RECURRENCE-ID" not in ev else frozenset()
+        for occ in expand_event(ev, tz, window_start, window_end, overridden):
+            events.append(occ)
+            if len(events) > MAX_WINDOW_OCCURRENCES:
+                raise ValueError(f"more than {MAX_WINDOW_OCCURRENCES} events in a single week")
+    events.sort()
+
+    # Bit i of busy is set while a class runs during minute i after window_start, so the page can
+    # answer "in class?" with one lookup and "next class?" with a binary search over starts
+    total = (window_end - window_start) // timedelta(minutes=1)
+    # Overlapping events are merged first, so each minute's bit is set at most once
+    busy = bytearray(total // 8)
+    spans = []
+    for start, end in events:
+        first = max(0, (start - window_start) // timedelta(minutes=1))
+        last = min(total, -(-(end - window_start) // timedelta(minutes=1)))
+        if spans and first <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], last)
+        elif first < last:
+            spans.append([first, last])
+    for first, last in spans:
+        for i in range(first, last):
+            busy[i >> 3] |= 1 << (i & 7)
+    return {
+        "tz": tz_name,
+        "windowStart": window_start.isoformat(),
+        "busyMinutes": base64.b64encode(bytes(busy)).decode(),
+        "starts": [start.isoformat() for start, _ in events],
+    }
+
+def write_atomic(path, data):
+    # Readers in other workers may be sending path right now; never let them see a half-written file
+    tmp = f"{path}.{secrets.token_hex(4)}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def write_precompressed(path, data):
+    # Write path.br / path.gz next to path so reads never compress on the fly
+    # quality 9 is within ~1% of 11 on ICS text at a small fraction of the CPU time
+    write_atomic(path + ".br", brotli.compress(data, quality=9))
+    write_atomic(path + ".gz", gzip.compress(data, compresslevel=9))
+
+def write_jcal(file_id, jcal=None):
+    # Write the pre-parsed schedule, rebuilding it from the stored .ics unless the caller already has it
+    if jcal is None:
+        with open(path_for(file_id, ".ics"), "rb") as f:
+            jcal = build_jcal(icalendar.Calendar.from_ical(f.read()))
+    data = orjson.dumps(jcal)
+    p = path_for(file_id, ".jcal")
+    write_precompressed(p, data)
+    write_atomic(p, data)
+
+def send_precompressed(p, mimetype, immutable=True):
+    # Pick the best precompressed variant the client accepts; each variant gets the file_etag of its
+    # own stat, tagged with its encoding. Raises FileNotFoundError if p itself is missing.
+    for encoding, ext in (("br", ".br"), ("gzip", ".gz")):
+        if encoding in request.accept_encodings:
+            try:
+                st = os.stat(p + ext)
+            except FileNotFoundError:
+                continue
+            rv = send_file(p + ext, mimetype=mimetype, conditional=True,
+                           etag=f"{file_etag(st)}-{encoding}", max_age=CACHE_MAX_AGE)
+            rv.headers["Content-Encoding"] = encoding
+            break
+    else:
+        st = os.stat(p)
+        rv = send_file(p, mimetype=mimetype, conditional=True, etag=file_etag(st), max_age=CACHE_MAX_AGE)
+    rv.vary.add("Accept-Encoding")
+    return set_cache_headers(rv, immutable)
+
 def allowed_filename(filename):
-    return os.path.splitext(filename)[1].lower() in ALLOWED_EXT
+    return filename.lower().endswith(ALLOWED_EXT)
 
 @app.route("/")
 def index():
@@ -39,207 +315,96 @@ def upload_schedule():
         return jsonify({"success": False, "error": "Only .ics files allowed"}), 400
 
     # Save file
-    file_id = uuid.uuid4().hex
-    safe_orig = secure_filename(uploaded.filename)
-    file_name = f"{file_id}.ics"
-    path = os.path.join(UPLOAD_DIR, file_name)
+    file_id = secrets.token_hex(8)  # 64 random bits, hex so ids stay URL- and filename-safe
+    safe_orig = uploaded.filename[:120].replace("/", "_").replace("\\", "_")  # only echoed back in metadata, never used as a path
+    path = path_for(file_id, ".ics")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
     try:
-        uploaded.save(path)
+        with open(path, "wb", buffering=0) as f:
+            shutil.copyfileobj(uploaded.stream, f, length=1 << 16)
     except Exception as e:
         return jsonify({"success": False, "error": f"Failed to save: {str(e)}"}), 500
 
+    # Parse the schedule once so viewers get JSON instead of parsing the ICS themselves
+    with open(path, "rb") as f:
+        raw = f.read()
+    # (everything that can fail runs before anything else is written, so a bad file leaves only the .ics to remove)
+    try:
+        cal = icalendar.Calendar.from_ical(raw)
+        jcal = build_jcal(cal)
+        summary = summarize_calendar(cal)
+    except Exception as e:
+        os.remove(path)
+        return jsonify({"success": False, "error": f"Invalid ICS file: {str(e)}"}), 400
+    write_jcal(file_id, jcal)
+    write_precompressed(path, raw)
+
     # Save metadata JSON
-    meta = {"id": file_id, "name": name or "Unnamed Student", "orig_name": safe_orig}
-    meta_path = os.path.join(UPLOAD_DIR, f"{file_id}.json")
-    with open(meta_path, "w", encoding="utf-8") as f:
-        json.dump(meta, f)
+    meta = {"id": file_id, "name": name or "Unnamed Student", "orig_name": safe_orig, **summary}
+    meta_path = path_for(file_id, ".json")
+    with open(meta_path, "wb") as f:
+        f.write(orjson.dumps(meta))
+    load_meta(file_id)  # prime the cache for the first /s/ hit
 
     # Provide share link
     base = request.url_root.rstrip("/")
     link = f"{base}/s/{file_id}"
     return jsonify({"success": True, "id": file_id, "name": meta["name"], "link": link})
 
-@app.route("/i/<file_id>", methods=["GET"])
+@app.route("/i/<file_id:file_id>", methods=["GET"])
 def get_ics(file_id):
     # Returns the raw .ics file
-    p = os.path.join(UPLOAD_DIR, f"{file_id}.ics")
-    if not os.path.exists(p):
+    if X_ACCEL_PREFIX:
+        # Let nginx stream the file (and 404 it): location /_protected/ { internal; alias /tmp/uploads/; }
+        ics_rel = os.path.relpath(path_for(file_id, ".ics"), UPLOAD_DIR)
+        rv = app.response_class("", mimetype="text/calendar",
+                                headers={"X-Accel-Redirect": f"{X_ACCEL_PREFIX.rstrip('/')}/{ics_rel}"})
+        return set_cache_headers(rv)
+    # conditional lets 304s skip the body; gunicorn's wsgi.file_wrapper sends the rest with sendfile()
+    try:
+        return send_precompressed(path_for(file_id, ".ics"), "text/calendar")
+    except FileNotFoundError:
         return abort(404)
-    return send_file(p, mimetype="text/calendar")
 
-@app.route("/meta/<file_id>", methods=["GET"])
+@app.route("/j/<file_id:file_id>", methods=["GET"])
+def get_jcal(file_id):
+    # Returns the events pre-parsed at upload time, rebuilt once a day so the window keeps moving.
+    # Uploads from before pre-parsing have no .jcal yet; it is built from the stored .ics on first use.
+    p = path_for(file_id, ".jcal")
+    try:
+        try:
+            stale = datetime.now().timestamp() - os.stat(p).st_mtime > 86400
+        except FileNotFoundError:
+            stale = True
+        if stale:
+            write_jcal(file_id)  # raises FileNotFoundError if the .ics is gone too
+        return send_precompressed(p, "application/json", immutable=False)
+    except FileNotFoundError:
+        return abort(404)
+    except ValueError:  # stored .ics (e.g. from before upload validation) can't be expanded
+        return abort(422)
+
+@app.route("/meta/<file_id:file_id>", methods=["GET"])
 def get_meta(file_id):
-    p = os.path.join(UPLOAD_DIR, f"{file_id}.json")
-    if not os.path.exists(p):
+    try:
+        st = os.stat(path_for(file_id, ".json"))
+        meta_json = _load_meta_cached(file_id, st.st_mtime_ns)[1]
+    except FileNotFoundError:
         return abort(404)
-    with open(p, "r", encoding="utf-8") as f:
-        return jsonify(json.load(f))
+    rv = app.response_class(meta_json, mimetype="application/json")
+    rv.set_etag(file_etag(st))
+    return set_cache_headers(rv).make_conditional(request)
 
-@app.route("/s/<file_id>", methods=["GET"])
+@app.route("/s/<file_id:file_id>", methods=["GET"])
 def schedule_page(file_id):
-    # Serve a small HTML page (AlturaTime UI) that fetches /i/<file_id> and /meta/<file_id>
-    meta_path = os.path.join(UPLOAD_DIR, f"{file_id}.json")
-    if not os.path.exists(meta_path):
+    # Serve the static AlturaTime UI shell; the page itself fetches /meta/<file_id> and /j/<file_id>
+    try:
+        load_meta(file_id)  # also warms the cache for the page's own /meta/ request
+    except FileNotFoundError:
         return abort(404)
-    with open(meta_path, "r", encoding="utf-8") as f:
-        meta = json.load(f)
-
-    # Simple HTML (client parses the ICS and renders the same UI as the Firebase frontend)
-    html = f"""<!doctype html>
-<html lang="en">
-<head>
-  <meta charset="utf-8" />
-  <title>AlturaTime — {{meta['name']}}</title>
-  <meta name="viewport" content="width=device-width,initial-scale=1" />
-  <link href="https://fonts.googleapis.com/css2?family=Nunito:wght@700;900&family=Lato:wght@400;700&display=swap" rel="stylesheet">
-  <script src="https://unpkg.com/ical.js@1.4.0/build/ical.min.js"></script>
-  <style>
-    body {{{{ font-family: 'Lato', sans-serif; background: #f8fafb; margin:0; padding:18px; color:#203040; }}}}
-    .container {{{{ max-width:760px; margin:20px auto; }}}}
-    .title {{{{ font-family:'Nunito',sans-serif; color:#2a9078; font-size:28px; font-weight:900; }}}}
-    .card {{{{ background:white; border-radius:10px; padding:18px; box-shadow:0 6px 18px rgba(0,0,0,0.06); margin-top:14px; }}}}
-    .city{{{{ font-weight:700; color:#e27d60; }}}}
-    .time{{{{ font-size:2rem; color:#2a9078; font-weight:700; }}}}
-    .call-status.safe{{{{ background:#5fb878;color:#fff;padding:6px 10px;border-radius:6px;display:inline-block }}}}
-    .call-status.avoid{{{{ background:#ef476f;color:#fff;padding:6px 10px;border-radius:6px;display:inline-block }}}}
-    .note{{ color:#2a9078;margin-top:8px }}
-    a.button{{ display:inline-block; padding:8px 12px; background:#2a9078; color:#fff; border-radius:8px; text-decoration:none }}
-    pre.ics{{ white-space:pre-wrap; background:#f1f5f6; padding:8px; border-radius:6px; font-size:0.85rem }}
-  </style>
-</head>
-<body>
-  <div class="container">
-    <div class="title">AlturaTime</div>
-    <div style="margin-top:8px">Schedule for: <strong>{{meta['name']}}</strong></div>
-    <div id="clockCard" class="card">
-      <div id="city" class="city">Loading...</div>
-      <div id="time" class="time">--:--</div>
-      <div id="status" class="call-status maybe">Loading</div>
-      <div id="note" class="note"></div>
-      <div id="next" style="margin-top:10px;color:#333"></div>
-    </div>
-
-    <div style="margin-top:12px">
-      <a class="button" href="/" target="_blank">Open AlturaTime Home</a>
-    </div>
-
-    <div style="margin-top:14px" class="card">
-      <div><strong>Raw schedule (for debugging)</strong></div>
-      <pre id="icsDump" class="ics">Loading ICS…</pre>
-    </div>
-  </div>
-
-<script>
-const fileId = "{{file_id}}";
-const meta = {{json.dumps(meta)}};
-const icsUrl = "/i/" + fileId;
-
-let loadedSchedule = null;
-let scheduleLocation = null;
-let scheduleEventCount = 0;
-
-function formatTimeDifference(targetDate, currentDate) {{{{
-  const diffMs = targetDate - currentDate;
-  const diffMins = Math.round(diffMs / 60000);
-  const hours = Math.floor(diffMins / 60);
-  const minutes = diffMins % 60;
-  if (hours > 0) return `${{{{hours}}}} hr ${{{{minutes}}}} min`;
-  return `${{{{minutes}}}} minutes`;
-}}}}
-
-function getStatusFromNow(now) {{{{
-  // now is Date in schedule tz (JS Date)
-  const hour = now.getHours();
-  const minute = now.getMinutes();
-  if (loadedSchedule) {{{{
-    for (const eventObj of loadedSchedule) {{{{
-      const comp = new ICAL.Component(eventObj);
-      const e = new ICAL.Event(comp);
-      const start = e.startDate.toJSDate();
-      const end = e.endDate.toJSDate();
-      if (now >= start && now <= end) {{{{
-        return {{{{status: "CLASS IN SESSION", cls:"avoid"}}}};
-      }}}}
-    }}}}
-  }}}}
-  const mins = hour * 60 + minute;
-  if (mins >= 420 && mins <= 1290) return {{{{status:"GOOD TO CALL", cls:"safe"}}}};
-  if (mins > 1290 || mins < 420) return {{{{status:"AVOID CALLING", cls:"avoid"}}}};
-  return {{{{status:"MAYBE", cls:"maybe"}}}};
-}}}}
-
-function getNextClassTime(now) {{{{
-  let next = null; let mindiff = Infinity;
-  if (!loadedSchedule) return null;
-  for (const eventObj of loadedSchedule) {{{{
-    const comp = new ICAL.Component(eventObj);
-    const e = new ICAL.Event(comp);
-    const start = e.startDate.toJSDate();
-    if (start > now) {{{{
-      const diff = start - now;
-      if (diff < mindiff) {{{{ mindiff = diff; next = start; }}}}
-    }}}}
-  }}}}
-  return next;
-}}}}
-
-async function fetchAndParse() {{{{
-  try {{{{
-    const r = await fetch(icsUrl);
-    if (!r.ok) throw new Error("ICS fetch failed");
-    const icsText = await r.text();
-    document.getElementById("icsDump").textContent = icsText.slice(0, 4000) + (icsText.length>4000 ? "\\n\\n... (truncated)" : "");
-    const jcal = ICAL.parse(icsText);
-    const comp = new ICAL.Component(jcal);
-    const vevents = comp.getAllSubcomponents("vevent");
-    loadedSchedule = vevents.map(v => v.toJSON());
-    scheduleEventCount = vevents.length;
-
-    // timezone detection
-    let tz = null;
-    const tzComp = comp.getFirstSubcomponent("vtimezone");
-    if (tzComp) tz = tzComp.getFirstPropertyValue("tzid");
-    if (!tz && vevents.length>0) {{{{
-      const first = vevents[0].getFirstProperty("dtstart");
-      if (first?.parameters?.tzid) tz = first.parameters.tzid;
-    }}}}
-    scheduleLocation = {{{{tzValue: tz || 'UTC', displayName: meta.name}}}};
-    renderClock();
-    setInterval(renderClock, 1000);
-  }}}} catch (err) {{{{
-    document.getElementById("city").textContent = "Failed to load schedule";
-    document.getElementById("time").textContent = "--:--";
-    document.getElementById("status").textContent = "ERROR";
-    console.error(err);
-  }}}}
-}}}}
-
-function renderClock() {{{{
-  if (!scheduleLocation) return;
-  const tz = scheduleLocation.tzValue;
-  const now = new Date(new Date().toLocaleString("en-US", {{{{timeZone: tz}}}}));
-  const t12 = now.toLocaleTimeString('en-US', {{{{hour:'numeric', minute:'2-digit', hour12:true, timeZone: tz}}}});
-  document.getElementById("city").textContent = scheduleLocation.displayName + " (" + tz + ")";
-  document.getElementById("time").textContent = t12;
-
-  const status = getStatusFromNow(now);
-  const statusEl = document.getElementById("status");
-  statusEl.className = "call-status " + status.cls;
-  statusEl.textContent = status.status;
-
-  const note = now.getHours() < 7 ? "Very Early Morning" : now.getHours() < 12 ? "Morning" : now.getHours() < 17 ? "Afternoon" : now.getHours() < 21 ? "Evening" : "Night";
-  document.getElementById("note").textContent = note;
-
-  const next = getNextClassTime(now);
-  document.getElementById("next").textContent = next ? "Next class in " + formatTimeDifference(next, now) : "No more upcoming classes today.";
-}}}}
-
-fetchAndParse();
-</script>
-</body>
-</html>"""
-    return render_template_string(html)
+    return send_file(SCHEDULE_PAGE, mimetype="text/html", max_age=SCHEDULE_PAGE_MAX_AGE)
 
 if __name__ == "__main__":
     # When testing locally, use: python server.py
+    # In production, use: gunicorn server:app (settings in gunicorn.conf.py)
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))